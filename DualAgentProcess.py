@@ -1,134 +1,400 @@
 import pandas as pd
 import chromadb
+from chromadb.utils import embedding_functions
 import asyncio
+import hashlib
 import uuid
-from chromadb.utils import embedding_functions
-from openai import AsyncOpenAI
+import re
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from llm_client import CLIENT, CachedLLM
 import os
+import orjson
+from async_lru import alru_cache
+import matplotlib
+matplotlib.use('Agg')  # Headless backend, pinned before pyplot is imported
 import matplotlib.pyplot as plt
 import seaborn as sns
+from fast_aggs import fast_sum, fast_yoy
+
+# Matches the first fenced code block, with or without a "python" tag
+_CODE_RE = re.compile(r"```(?:python)?\s*(.*?)```", re.DOTALL)
+
+# Local ONNX MiniLM model shared by every RAGAgent (loaded lazily on first use)
+EMBEDDING_FN = embedding_functions.ONNXMiniLM_L6_V2()
+
+@alru_cache(maxsize=1024)
+async def _embed_query(text):
+    """Query embeddings are deterministic, so repeated report queries reuse them."""
+    return (await asyncio.to_thread(EMBEDDING_FN, [text]))[0]
+
+def artifact_id(query):
+    """Stable 64-bit id for a query, used as the plot filename of precomputed steps."""
+    return hashlib.blake2b(query.encode(), digest_size=8).hexdigest()
+
+# --- Sandbox Process Pool ---
+# Generated code is CPU-bound and holds the GIL, so it runs in worker processes.
+# Each worker receives the DataFrame once (at start-up), not once per task.
+EXECUTOR = None
+_EXECUTOR_KEY = None
+_WORKER_DF = None
+PLOT_DPI = 80  # UI thumbnails; roughly halves PNG encode time and size vs. 100+
+VIEW_MAX_ROWS = 500  # a plot rasterizes to ~800px, so more rows add nothing visible
+_WORKER_FIG = None
+_WORKER_AX = None
+
+def _init_sandbox_worker(df):
+    global _WORKER_DF, _WORKER_FIG, _WORKER_AX
+    _WORKER_DF = df
+    # One pooled figure per worker: pays matplotlib's first-figure cost up front
+    _WORKER_FIG, _WORKER_AX = plt.subplots(figsize=(8, 5))
+
+def _sandbox_worker(code, plot_path, view=None):
+    """Runs exec() in a worker process against a copy of the worker's DataFrame."""
+    # Generated code may mutate df (new columns, inplace drops); never let that reach the next task
+    local_scope = {"df": _WORKER_DF.copy(), "view": view, "plt": plt, "sns": sns, "pd": pd, "plot_path": plot_path,
+                   "fig": _WORKER_FIG, "ax": _WORKER_AX,
+                   "fast_sum": fast_sum, "fast_yoy": fast_yoy}
+    try:
+        exec(code, {}, local_scope)
+        image_path = local_scope.get("image_path", None)
+        if image_path:
+            # Code that made its own figure despite the prompt: save whatever it drew last
+            figure = _WORKER_FIG if _has_data(_WORKER_FIG) else plt.gcf()
+            if _has_data(figure):
+                _save_figure(figure, image_path)
+            else:
+                image_path = None  # Nothing was drawn, so don't hand out a URL that would 404
+        return {
+            "agent": "Pandas",
+            "status": "success",
+            "insight": local_scope.get("final_answer", "Calculation complete."),
+            "image": image_path,
+            "code_executed": code
+        }
+    except Exception as e:
+        return {"agent": "Pandas", "status": "error", "error": str(e)}
+    finally:
+        _recycle_figure()
+
+def _plot_aggregate_worker(series, chart, plot_path):
+    """Draws a precomputed aggregate on the worker's pooled figure."""
+    try:
+        series.plot(kind=chart, ax=_WORKER_AX)
+        _WORKER_AX.set_ylabel(series.name)
+        _save_figure(_WORKER_FIG, plot_path)
+        return plot_path
+    finally:
+        _recycle_figure()
+
+def _save_figure(fig, path):
+    """Write-then-rename, so /artifacts never serves a half-written PNG."""
+    tmp_path = f"{path}.{os.getpid()}.tmp.png"
+    fig.savefig(tmp_path, dpi=PLOT_DPI, bbox_inches="tight")
+    os.replace(tmp_path, path)
+
+def _has_data(fig):
+    return any(axes.has_data() for axes in fig.axes)
+
+def _recycle_figure():
+    """Resets the pooled figure (axes, suptitle, figure legends) and closes any figure the generated code created."""
+    global _WORKER_FIG, _WORKER_AX
+    if not plt.fignum_exists(_WORKER_FIG.number) or plt.figure(_WORKER_FIG.number) is not _WORKER_FIG:
+        # Generated code closed the pooled figure (e.g. a trailing plt.close()): start over
+        plt.close('all')
+        _WORKER_FIG, _WORKER_AX = plt.subplots(figsize=(8, 5))
+        return
+
+    _WORKER_FIG.clf()
+    _WORKER_AX = _WORKER_FIG.add_subplot()
+    for num in plt.get_fignums():
+        if plt.figure(num) is not _WORKER_FIG:
+            plt.close(num)
+    plt.figure(_WORKER_FIG.number)  # Pooled figure is current again for the next task
+
+def data_key(df):
+    """Content hash of a frame; computed once per dataset load, not per request."""
+    return int(pd.util.hash_pandas_object(df).sum())
+
+def _get_executor(df, key):
+    """Returns the shared pool, restarting it only when the data itself changed."""
+    global EXECUTOR, _EXECUTOR_KEY
+    if EXECUTOR is None or key != _EXECUTOR_KEY:
+        if EXECUTOR is not None:
+            EXECUTOR.shutdown(wait=False)
+        EXECUTOR = ProcessPoolExecutor(
+            max_workers=4,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_sandbox_worker,
+            initargs=(df,)
+        )
+        _EXECUTOR_KEY = key
+    return EXECUTOR
 
 # --- Agent 1: Pandas Agent (High-Level Aggregation) ---
 class PandasAgent:
-    def __init__(self, df):
+    def __init__(self, df, cached_aggs=None, view_cache=None, key=None):
         self.df = df
+        self.cached_aggs = cached_aggs or {}  # {query: (spec, Series)} from fast_aggs
+        self.view_cache = view_cache if view_cache is not None else {}  # {group key: reduced frame}
+        self._group_keys = [col for col in self.df.columns if isinstance(self.df[col].dtype, pd.CategoricalDtype)]
+        if "Year" in self.df.columns:
+            self._group_keys.append("Year")
         self.output_dir = "artifacts"
         os.makedirs(self.output_dir, exist_ok=True)
-        self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.client = CLIENT
+        self.llm = CachedLLM(self.client)
+        # Keeps the pool and plot filenames tied to the data they were built from
+        self.data_key = key if key is not None else data_key(self.df)
+        self.executor = _get_executor(self.df, self.data_key)
 
-    async def execute_task(self, query):
-        """Generates code asynchronously and executes it in a thread."""
-        
-        unique_id = uuid.uuid4().hex[:8]
-        plot_filename = f"plot_{unique_id}.png"
+        # Schema is fixed for the life of the agent, so build the prompts once
+        self._schema_info = self.df.dtypes.to_string()
+        requirements = """
+        1. Write python code to solve the task.
+        2. Store the text summary in a variable called `final_answer`.
+        3. Create a matplotlib/seaborn plot if the result is a table or list of numbers.
+           Draw it on the provided axes `ax` (e.g. `sns.barplot(..., ax=ax)`); do not create new figures.
+        4. If a plot is needed, set `image_path = plot_path`; the figure is saved for you.
+        5. For group-by sums, use the provided helpers instead of df.groupby:
+           - `fast_sum(df, by, value_col)` returns the per-group totals as a Series.
+           - `fast_yoy(df, value_col, year_col='Year', month_col=None)` returns yearly totals with a 'YoY_Growth_%' column.
+        6. If the task groups by a column, `view` holds `df` already grouped by it (index = that column,
+           columns such as 'Sales_Volume_sum' or 'Price_USD_mean', at most 500 rows, float32); plot from
+           `view` rather than the raw `df`, but compute numbers for `final_answer` from `df`. Otherwise `view` is None."""
+
+        self._prompt_template = f"""
+        You are a Python Data Analyst. You have a pandas DataFrame named `df`.
         
-        # 1. Construct System Prompt
-        schema_info = self.df.dtypes.to_string()
-        prompt = f"""
+        Schema:
+        {self._schema_info}
+
+        Task: {{query}}
+
+        Requirements:{requirements}
+        7. Return ONLY the python code inside markdown blocks.
+        """
+
+        self._batch_prompt_template = f"""
         You are a Python Data Analyst. You have a pandas DataFrame named `df`.
         
         Schema:
-        {schema_info}
+        {self._schema_info}
 
-        Task: {query}
+        Tasks:
+        {{tasks}}
 
-        Requirements:
-        1. Write python code to solve the task.
-        2. Store the text summary in a variable called `final_answer`.
-        3. Create a matplotlib/seaborn plot if the result is a table or list of numbers.
-        4. If a plot is needed, save it to '{self.output_dir}/{plot_filename}' and store path in `image_path`.
-        5. Return ONLY the python code inside markdown blocks.
+        Requirements (each task runs as its own separate program):{requirements}
+        7. Return a JSON object {{{{"results": [{{{{"code": "..."}}}}]}}}} with one entry per task, in task order.
         """
 
-        # 2. Call OpenAI (Non-blocking)
-        response = await self.client.chat.completions.create(
+    async def execute_task(self, query):
+        """Generates code asynchronously and executes it in a worker process."""
+        if query in self.cached_aggs:
+            return await self._serve_precomputed(query)
+        
+        # 1. Fill the cached System Prompt
+        prompt = self._prompt_template.format(query=query)
+
+        # 2. Call OpenAI through the semantic cache (Non-blocking)
+        raw_code = await self.llm.complete(
             model="gpt-5.1",
-            messages=[{"role": "system", "content": prompt}]
+            messages=[{"role": "system", "content": prompt}],
+            cache_text=query
         )
-        raw_code = response.choices[0].message.content
         cleaned_code = self._extract_code(raw_code)
 
-        # 3. Execute Code in a separate thread (CPU-bound)
-        return await asyncio.to_thread(self._run_code_sandbox, cleaned_code)
+        # 3. Execute Code in a worker process (CPU-bound, holds the GIL)
+        return await self._run_in_sandbox(cleaned_code, query)
+
+    async def execute_batch(self, queries):
+        """Serves precomputed steps directly and generates code for the rest in one completion."""
+        llm_queries = [query for query in queries if query not in self.cached_aggs]
+        llm_results, precomputed_results = await asyncio.gather(
+            self._execute_llm_batch(llm_queries),
+            asyncio.gather(*[self._serve_precomputed(q) for q in queries if q in self.cached_aggs])
+        )
+
+        # Merge both result lists back into the input order
+        llm_iter, precomputed_iter = iter(llm_results), iter(precomputed_results)
+        return [next(precomputed_iter) if query in self.cached_aggs else next(llm_iter) for query in queries]
+
+    async def _execute_llm_batch(self, queries):
+        """Generates code for several tasks in one completion, then runs each in the pool."""
+        if not queries:
+            return []
+        if len(queries) == 1:
+            return [await self.execute_task(queries[0])]
+
+        # 1. One prompt listing every task
+        tasks = "\n        ".join(f"{i}. {query}" for i, query in enumerate(queries, 1))
+        prompt = self._batch_prompt_template.format(tasks=tasks)
 
-    def _run_code_sandbox(self, code):
-        """Helper function to run exec() in a thread."""
-        local_scope = {"df": self.df, "plt": plt, "sns": sns, "pd": pd}
+        # 2. Single structured-output call through the semantic cache
+        raw_json = await self.llm.complete(
+            model="gpt-5.1",
+            messages=[{"role": "system", "content": prompt}],
+            cache_text=tasks,
+            response_format={"type": "json_object"}
+        )
         try:
-            exec(code, {}, local_scope)
-            return {
-                "agent": "Pandas",
-                "status": "success",
-                "insight": local_scope.get("final_answer", "Calculation complete."),
-                "image": local_scope.get("image_path", None),
-                "code_executed": code
-            }
-        except Exception as e:
-            return {"agent": "Pandas", "status": "error", "error": str(e)}
+            codes = [self._extract_code(item["code"]) for item in orjson.loads(raw_json)["results"]]
+        except (orjson.JSONDecodeError, KeyError, TypeError):
+            codes = []
+
+        if len(codes) != len(queries):
+            # Malformed batch answer: fall back to one completion per task
+            return await asyncio.gather(*[self.execute_task(query) for query in queries])
+
+        # 3. Execute every program in the worker pool concurrently
+        return await asyncio.gather(*[self._run_in_sandbox(code, query) for code, query in zip(codes, queries)])
+
+    async def _serve_precomputed(self, query):
+        """Answers a fixed group-by step from the startup aggregates; only the plot is rendered."""
+        spec, series = self.cached_aggs[query]
+        # Same spec on the same data always draws the same plot, so the name can be stable
+        plot_path = f"{self.output_dir}/plot_{artifact_id(f'{self.data_key}:{query}')}.png"
+        if os.path.exists(plot_path):
+            image_path = plot_path  # Same query on the same data: the plot is already on disk
+        else:
+            loop = asyncio.get_running_loop()
+            try:
+                image_path = await loop.run_in_executor(
+                    self.executor, _plot_aggregate_worker, series, spec.get("chart", "bar"), plot_path
+                )
+            except Exception as e:
+                return {"agent": "Pandas", "status": "error", "error": str(e)}
+
+        label = "Total" if spec["agg"] == "sum" else "Average"
+        return {
+            "agent": "Pandas",
+            "status": "success",
+            "insight": f"{label} {spec['value']} by {spec['by']}:\n{series.to_string()}",
+            "image": image_path,
+            "code_executed": f"# Precomputed at startup (fast_aggs): {spec['agg']} of {spec['value']} by {spec['by']}"
+        }
+
+    def _prepare_view(self, query):
+        """Returns df grouped by the first column the query names, capped at VIEW_MAX_ROWS; None if no key matches."""
+        normalized = query.lower().replace(" ", "_")
+        key = next((col for col in self._group_keys if col.lower() in normalized), None)
+        if key is None:
+            return None
+
+        if key not in self.view_cache:
+            numeric_cols = [col for col in self.df.select_dtypes("number").columns if col != key]
+            view = self.df.groupby(key, observed=True)[numeric_cols].agg(["sum", "mean"])
+            view.columns = [f"{col}_{agg}" for col, agg in view.columns]
+            # float32 is plenty for a plot and halves what is pickled to the worker; df keeps full precision
+            self.view_cache[key] = view.head(VIEW_MAX_ROWS).astype("float32")
+        return self.view_cache[key]
+
+    async def _run_in_sandbox(self, code, query):
+        # Generated code may draw something different on every run: always a fresh name
+        plot_path = f"{self.output_dir}/plot_{uuid.uuid4().hex}.png"
+        view = self._prepare_view(query)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, _sandbox_worker, code, plot_path, view)
 
     def _extract_code(self, text):
-        if "```python" in text:
-            return text.split("```python")[1].split("```")[0].strip()
-        return text.strip()
+        match = _CODE_RE.search(text)
+        return match.group(1).strip() if match else text.strip()
 
 
 # --- Agent 2: RAG Agent (Detailed Context) ---   
+# A RAGAgent is built per request, so concurrent requests must not both ingest an empty collection
+_INGESTION_LOCK = asyncio.Lock()
+
 class RAGAgent:
     def __init__(self, df):
         self.df = df
-        self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.client = CLIENT
+        self.llm = CachedLLM(self.client)
         
         # ChromaDB Client (Local)
         self.chroma_client = chromadb.PersistentClient(path="./chroma_db")
         
-        # Standard embedding function for ingestion (Sync)
-        self.embedding_fn = embedding_functions.OpenAIEmbeddingFunction(
-            api_key=os.getenv("OPENAI_API_KEY"),
-            model_name="text-embedding-3-small"
-        )
+        # Local ONNX MiniLM embeddings: no network round trips for ingestion or search
+        self.embedding_fn = EMBEDDING_FN
         
+        # New collection name: MiniLM vectors (384-d) can't share an index with OpenAI ones
         self.collection = self.chroma_client.get_or_create_collection(
-            name="sales_details",
-            embedding_function=self.embedding_fn
+            name="sales_details_minilm",
+            embedding_function=self.embedding_fn,
+            # HNSW tuned for recall/latency at this scale (only applied on creation)
+            metadata={
+                "hnsw:space": "cosine",
+                "hnsw:construction_ef": 200,
+                "hnsw:M": 32,
+                "hnsw:search_ef": 64
+            }
         )
         
-        # Ingestion check
-        if self.collection.count() == 0:
-            print(f"Collection is empty. Starting ingestion of {len(df)} rows...")
-            self._ingest_data()
+        # Ingestion check (the actual ingestion is async, see ensure_ingested)
+        self._needs_ingestion = self.collection.count() == 0
+        if self._needs_ingestion:
+            print(f"Collection is empty. Ingestion of {len(df)} rows is pending...")
         else:
             print(f"Loaded {self.collection.count()} existing documents from disk.")
 
-    def _ingest_data(self):
-        """Ingest data (Synchronous - happens rarely)."""
-        documents = []
-        ids = []
+    async def ensure_ingested(self):
+        """Runs the async ingestion once if the collection was empty at startup."""
+        if not self._needs_ingestion:
+            return
+        async with _INGESTION_LOCK:
+            # Another request may have ingested while this one waited for the lock
+            if await asyncio.to_thread(self.collection.count) == 0:
+                await self._ingest_data_async()
+            self._needs_ingestion = False
+
+    async def _ingest_data_async(self):
+        """Ingest data, embedding locally off the event loop (happens rarely)."""
+        df = self.df
         
         print("Preparing documents...")
-        for idx, row in self.df.iterrows():
-            doc = f"Vehicle: {row.get('Model')} ({row.get('Year')}). Region: {row.get('Region')}. Specs: {row.get('Transmission')}, {row.get('Fuel_Type')}. Price: ${row.get('Price_USD')}."
-            documents.append(doc)
-            ids.append(str(idx))
+        doc_cols = ['Model', 'Year', 'Region', 'Transmission', 'Fuel_Type', 'Price_USD']
+        if all(col in df.columns for col in doc_cols):
+            # Build every document in one vectorized pass instead of row-by-row
+            docs_series = (
+                "Vehicle: " + df['Model'].astype(str) + " (" + df['Year'].astype(str) + "). "
+                + "Region: " + df['Region'].astype(str) + ". "
+                + "Specs: " + df['Transmission'].astype(str) + ", " + df['Fuel_Type'].astype(str) + ". "
+                + "Price: $" + df['Price_USD'].astype(str) + "."
+            )
+            documents = docs_series.tolist()
+        else:
+            # Some columns are missing: fill them with None, using plain tuples (no Series per row)
+            cols = {c: i + 1 for i, c in enumerate(df.columns)}
+            def field(row, name):
+                return row[cols[name]] if name in cols else None
+            documents = [
+                f"Vehicle: {field(row, 'Model')} ({field(row, 'Year')}). Region: {field(row, 'Region')}. "
+                f"Specs: {field(row, 'Transmission')}, {field(row, 'Fuel_Type')}. Price: ${field(row, 'Price_USD')}."
+                for row in df.itertuples(index=True, name=None)
+            ]
+        ids = df.index.astype(str).tolist()
             
-        BATCH_SIZE = 500
         total_docs = len(documents)
-        
+        print(f"Embedding {total_docs} documents...")
+        all_vecs = await self._embed(documents)
+
+        # One bulk add, split only if it exceeds Chroma's own batch limit
         print(f"Ingesting {total_docs} documents...")
-        for i in range(0, total_docs, BATCH_SIZE):
-            end_index = min(i + BATCH_SIZE, total_docs)
-            self.collection.add(documents=documents[i:end_index], ids=ids[i:end_index])
+        max_batch = self.chroma_client.get_max_batch_size()
+        for i in range(0, total_docs, max_batch):
+            self.collection.add(
+                documents=documents[i:i + max_batch],
+                embeddings=all_vecs[i:i + max_batch],
+                ids=ids[i:i + max_batch]
+            )
             
         print("Ingestion complete.")
 
     async def execute_task(self, query):
         """Retrieves records and generates answer asynchronously."""
         
-        # 1. Generate Embedding Async (Prevents blocking during search)
-        emb_response = await self.client.embeddings.create(
-            input=query,
-            model="text-embedding-3-small"
-        )
-        query_embedding = emb_response.data[0].embedding
+        # 1. Generate Embedding in a thread, cached across calls (Prevents blocking during search)
+        query_embedding = await _embed_query(query)
         
         # 2. Query Chroma with the embedding (Fast local read)
         results = self.collection.query(
@@ -136,23 +402,96 @@ class RAGAgent:
             n_results=5
         )
         
-        if not results['documents'] or not results['documents'][0]:
+        documents = results['documents'][0] if results['documents'] else []
+        return await self._synthesize_answer(query, documents)
+
+    async def execute_batch(self, queries):
+        """Answers several queries with one embedding pass and one Chroma query."""
+        
+        # 1. Embed the queries (memoized, so repeated report queries skip the model)
+        query_embeddings = list(await asyncio.gather(*[_embed_query(query) for query in queries]))
+        
+        # 2. One multi-query Chroma call; results are aligned with the inputs
+        results = self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=5
+        )
+        all_documents = results['documents'] or [[] for _ in queries]
+        
+        # 3. Synthesize every answer in one completion (single query: plain path)
+        if len(queries) == 1:
+            return [await self._synthesize_answer(queries[0], all_documents[0])]
+        return await self._synthesize_batch(queries, all_documents)
+
+    async def _embed(self, texts):
+        """Runs the CPU-bound ONNX embedding model in a worker thread."""
+        return await asyncio.to_thread(self.embedding_fn, texts)
+
+    async def _synthesize_batch(self, queries, all_documents):
+        """Answers every query that has context with one structured-output call."""
+        answers = [None] * len(queries)
+        answerable = [i for i, documents in enumerate(all_documents) if documents]
+        contexts = {i: "\n".join(all_documents[i]) for i in answerable}
+
+        if answerable:
+            questions = "\n\n".join(
+                f"### Question {n}\nContext:\n{contexts[i]}\n\nQuestion: {queries[i]}"
+                for n, i in enumerate(answerable, 1)
+            )
+            raw_json = await self.llm.complete(
+                model="gpt-5.1",
+                messages=[
+                    {"role": "system", "content": (
+                        "You are a detailed researcher. Use the context provided with each question to answer it. "
+                        'Return a JSON object {"answers": ["..."]} with one answer per question, in question order.'
+                    )},
+                    {"role": "user", "content": questions}
+                ],
+                cache_text=questions,
+                response_format={"type": "json_object"}
+            )
+            try:
+                batch_answers = orjson.loads(raw_json)["answers"]
+            except (orjson.JSONDecodeError, KeyError, TypeError):
+                batch_answers = []
+
+            if len(batch_answers) != len(answerable):
+                # Malformed batch answer: fall back to one completion per query
+                return await asyncio.gather(*[
+                    self._synthesize_answer(query, documents)
+                    for query, documents in zip(queries, all_documents)
+                ])
+
+            for i, answer in zip(answerable, batch_answers):
+                answers[i] = {
+                    "agent": "RAG",
+                    "status": "success",
+                    "insight": answer,
+                    "context_used": contexts[i]
+                }
+
+        no_data = {"agent": "RAG", "status": "error", "insight": "No relevant data found."}
+        return [answer if answer is not None else dict(no_data) for answer in answers]
+
+    async def _synthesize_answer(self, query, documents):
+        if not documents:
             return {"agent": "RAG", "status": "error", "insight": "No relevant data found."}
 
-        retrieved_context = "\n".join(results['documents'][0])
+        retrieved_context = "\n".join(documents)
 
-        # 3. Synthesize Answer Async
-        response = await self.client.chat.completions.create(
+        user_prompt = f"Context:\n{retrieved_context}\n\nQuestion: {query}"
+        answer = await self.llm.complete(
             model="gpt-5.1",
             messages=[
                 {"role": "system", "content": "You are a detailed researcher. Use the provided context to answer the query."},
-                {"role": "user", "content": f"Context:\n{retrieved_context}\n\nQuestion: {query}"}
-            ]
+                {"role": "user", "content": user_prompt}
+            ],
+            cache_text=user_prompt
         )
 
         return {
             "agent": "RAG",
             "status": "success",
-            "insight": response.choices[0].message.content,
+            "insight": answer,
             "context_used": retrieved_context
         }
\ No newline at end of file
@@ -1,4 +1,5 @@
 import os
+import hashlib
 import pandas as pd
 import logging
 
@@ -7,6 +8,7 @@ class AppConfig:
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     DATA_PATH = "data\BMW sales data (2020-2024).xlsx"
     OUTPUT_DIR = "artifacts"
+    CACHE_DIR = "cache"
     
     # Instructions extracted from the user requirements
     REPORT_INSTRUCTIONS = [
@@ -26,12 +28,59 @@ class AppConfig:
             "query": "What are the specific key features or specs of the M5 in Europe versus other regions?"
         }
     ]
+
+    # Default plan when the user gives no instructions. "aggregate" marks steps whose
+    # answer is a fixed group-by, precomputed once per dataset (see fast_aggs)
+    DEFAULT_INSTRUCTIONS = [
+        {
+            "section": "Global Sales Trends",
+            "type": "high_level",
+            "query": "Group data by Year and calculate total Sales_Volume to show the trend over time.",
+            "aggregate": {"by": "Year", "value": "Sales_Volume", "agg": "sum", "chart": "line"}
+        },
+        {
+            "section": "Performance by Region",
+            "type": "high_level",
+            "query": "Calculate total Sales_Volume by Region. Sort descending to identify top and bottom performers.",
+            "aggregate": {"by": "Region", "value": "Sales_Volume", "agg": "sum", "chart": "bar", "sort_desc": True}
+        },
+        {
+            "section": "Price & Segment Drivers",
+            "type": "high_level",
+            "query": "Analyze average Price_USD by Model to see which segments drive the most value.",
+            "aggregate": {"by": "Model", "value": "Price_USD", "agg": "mean", "chart": "bar", "sort_desc": True}
+        },
+        {
+            "section": "Regulatory Context",
+            "type": "detailed",
+            "query": "What key market drivers or regulations might impact sales trends for these models?"
+        }
+    ]
+
+    # Requests that ARE the canonical report (compared after lowercasing and stripping punctuation)
+    # are served by REPORT_INSTRUCTIONS without the LLM planner; anything more specific is planned
+    REPORT_TEMPLATE_PHRASES = [
+        "sales report",
+        "regional sales report",
+        "sales trends report",
+        "sales trends and regional performance",
+        "regional performance and sales trends",
+        "yoy sales report",
+        "year over year sales report",
+        "sales trends yoy growth and regional performance"
+    ]
     
 
 # --- Data Ingestion Layer ---
 class DataIngestion:
-    def __init__(self, file_path):
+    # Cleaned frames memoized by (path, mtime), one entry per path, so repeat loads skip the reload
+    _cache = {}
+    # Bump whenever _clean_data changes so stale Parquet caches are not reused
+    CLEAN_VERSION = 3
+
+    def __init__(self, file_path, cache_dir=AppConfig.CACHE_DIR):
         self.file_path = file_path
+        self.cache_dir = cache_dir
         self.df = None
 
     def load_data(self):
@@ -39,15 +88,38 @@ class DataIngestion:
         if not os.path.exists(self.file_path):
             raise FileNotFoundError(f"Data file not found at: {self.file_path}")
 
-        print(f"Loading data from {self.file_path}...")
-        # Handle CSV or Excel based on extension
-        if self.file_path.endswith('.csv'):
-            self.df = pd.read_csv(self.file_path)
+        cache_key = (self.file_path, os.path.getmtime(self.file_path))
+        cached = DataIngestion._cache.get(cache_key)
+        if cached is not None:
+            self.df = cached.copy()
+            return self.df
+
+        # Cleaned data is persisted as Parquet, addressed by the file contents
+        with open(self.file_path, 'rb') as f:
+            content_hash = hashlib.sha1(f.read()).hexdigest()
+        parquet_path = os.path.join(self.cache_dir, f"{content_hash}.v{self.CLEAN_VERSION}.parquet")
+
+        if os.path.exists(parquet_path):
+            print(f"Loading cleaned data from {parquet_path}...")
+            self.df = pd.read_parquet(parquet_path)
         else:
-            self.df = pd.read_excel(self.file_path)
+            print(f"Loading data from {self.file_path}...")
+            # Handle CSV or Excel based on extension
+            if self.file_path.endswith('.csv'):
+                self.df = pd.read_csv(self.file_path)
+            else:
+                # Rust-backed reader, much faster than the default openpyxl
+                self.df = pd.read_excel(self.file_path, engine="calamine")
+
+            # Basic cleaning
+            self._clean_data()
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self.df.to_parquet(parquet_path)
 
-        # Basic cleaning
-        self._clean_data()
+        # Only the latest version of a file is kept; older frames would never be read again
+        for key in [key for key in DataIngestion._cache if key[0] == self.file_path]:
+            del DataIngestion._cache[key]
+        DataIngestion._cache[cache_key] = self.df.copy()
         return self.df
 
     def _clean_data(self):
@@ -57,6 +129,12 @@ class DataIngestion:
                 self.df[col] = pd.to_numeric(self.df[col], errors='coerce')
         
         self.df.dropna(subset=['Price_USD', 'Sales_Volume'], inplace=True)
+
+        # Low-cardinality strings as categoricals: groupbys run on int codes
+        categorical_cols = ['Region', 'Model', 'Model_Type', 'Transmission', 'Fuel_Type', 'Color']
+        for col in categorical_cols:
+            if col in self.df.columns:
+                self.df[col] = self.df[col].astype('category')
         print(f"Data loaded successfully. Shape: {self.df.shape}")
 
     def get_schema(self):
@@ -1,14 +1,13 @@
 import os
-from openai import AsyncOpenAI
+from llm_client import CLIENT
 
 class InsightSynthesizer:
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.client = CLIENT
 
-    # Generates the whole report in one shot ---
-    async def generate_full_report(self, grouped_data):
+    def _build_prompt(self, grouped_data):
         """
-        Generates a comprehensive report in a single pass using data from ALL sections.
+        Builds the single report prompt from ALL sections.
         grouped_data: { "Section Title": { "pandas": ..., "rag": ... } }
         """
         
@@ -48,16 +47,36 @@ class InsightSynthesizer:
         INPUT DATA FROM AGENTS:
         {full_context}
         """
+        return prompt
+
+    # Generates the whole report in one shot ---
+    async def generate_full_report(self, grouped_data):
+        """Generates a comprehensive report in a single pass using data from ALL sections."""
+        prompt = self._build_prompt(grouped_data)
 
-        # 3. Generate Full Text
+        # Generate Full Text
         response = await self.client.chat.completions.create(
             model="gpt-4o", # Updated to a valid model name
             messages=[{"role": "system", "content": prompt}]
         )
         
-        final_text = response.choices[0].message.content
-        
-        # 4. Inject Images back into the text
+        return self.inject_images(response.choices[0].message.content, grouped_data)
+
+    async def generate_full_report_stream(self, grouped_data):
+        """Same report as generate_full_report, yielded as text deltas (images not injected)."""
+        prompt = self._build_prompt(grouped_data)
+
+        stream = await self.client.chat.completions.create(
+            model="gpt-4o",
+            messages=[{"role": "system", "content": prompt}],
+            stream=True
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def inject_images(self, final_text, grouped_data):
+        """Inserts each section's chart under its header (or appends it)."""
         for section, data in grouped_data.items():
             if data.get('pandas') and data.get('pandas').get('image'):
                 image_path = data['pandas']['image']
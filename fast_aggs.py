@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+from numba import njit, prange, get_num_threads
+
+# --- Numba Kernels ---
+@njit(parallel=True, cache=True)
+def group_sum(codes, values, ngroups, nchunks):
+    """Per-group sum over integer group codes (code -1 and NaN values are skipped)."""
+    # nchunks is passed in: reading the thread count in here would keep numba from caching the kernel
+    n = len(codes)
+    chunk = (n + nchunks - 1) // nchunks
+
+    # Each thread accumulates into its own row, so there are no write races
+    partial = np.zeros((nchunks, ngroups))
+    for c in prange(nchunks):
+        for i in range(c * chunk, min((c + 1) * chunk, n)):
+            g = codes[i]
+            v = values[i]
+            if g >= 0 and not np.isnan(v):
+                partial[c, g] += v
+    return partial.sum(axis=0)
+
+
+@njit(cache=True)
+def group_yoy(year_codes, month_codes, values, nyears, nmonths):
+    """Year x month totals plus Year-over-Year growth (%) of the yearly totals."""
+    grid = np.zeros((nyears, nmonths))
+    for i in range(len(values)):
+        y = year_codes[i]
+        m = month_codes[i]
+        v = values[i]
+        if y >= 0 and m >= 0 and not np.isnan(v):
+            grid[y, m] += v
+
+    totals = grid.sum(axis=1)
+    yoy = np.full(nyears, np.nan)
+    for y in range(1, nyears):
+        if totals[y - 1] != 0:
+            yoy[y] = (totals[y] - totals[y - 1]) / totals[y - 1] * 100.0
+    return grid, yoy
+
+
+# --- Sandbox Helpers (exposed to the Pandas Agent) ---
+def fast_sum(df, by, value_col="Sales_Volume"):
+    """Equivalent of df.groupby(by)[value_col].sum(), returned as a Series."""
+    cat = pd.Categorical(df[by])
+    totals = group_sum(
+        cat.codes.astype(np.int64),
+        df[value_col].to_numpy(dtype=np.float64),
+        len(cat.categories),
+        get_num_threads()
+    )
+    if pd.api.types.is_integer_dtype(df[value_col].dtype):
+        # Integer sums are exact in float64 here; report them as integers like pandas does
+        totals = totals.astype(np.int64)
+    return pd.Series(totals, index=pd.Index(cat.categories, name=by), name=value_col)
+
+
+def fast_mean(df, by, value_col="Price_USD"):
+    """Equivalent of df.groupby(by)[value_col].mean(), returned as a Series."""
+    cat = pd.Categorical(df[by])
+    codes = cat.codes.astype(np.int64)
+    values = df[value_col].to_numpy(dtype=np.float64)
+    totals = group_sum(codes, values, len(cat.categories), get_num_threads())
+    counts = group_sum(codes, (~np.isnan(values)).astype(np.float64), len(cat.categories), get_num_threads())
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = totals / counts
+    return pd.Series(means, index=pd.Index(cat.categories, name=by), name=value_col)
+
+
+def fast_yoy(df, value_col="Sales_Volume", year_col="Year", month_col=None):
+    """Yearly totals of value_col with YoY growth; adds one column per month if month_col is given."""
+    years = pd.Categorical(df[year_col])
+    if month_col is not None:
+        months = pd.Categorical(df[month_col])
+        month_codes = months.codes.astype(np.int64)
+        nmonths = len(months.categories)
+    else:
+        month_codes = np.zeros(len(df), dtype=np.int64)
+        nmonths = 1
+
+    grid, yoy = group_yoy(
+        years.codes.astype(np.int64),
+        month_codes,
+        df[value_col].to_numpy(dtype=np.float64),
+        len(years.categories),
+        nmonths
+    )
+
+    if pd.api.types.is_integer_dtype(df[value_col].dtype):
+        grid = grid.astype(np.int64)  # Exact integer totals, as in fast_sum
+
+    index = pd.Index(years.categories, name=year_col)
+    result = pd.DataFrame({value_col: grid.sum(axis=1), "YoY_Growth_%": yoy}, index=index)
+    if month_col is not None:
+        monthly = pd.DataFrame(grid, index=index, columns=months.categories)
+        result = pd.concat([result, monthly], axis=1)
+    return result
+
+
+# --- Precomputed Aggregates (for fixed plan steps) ---
+_AGGREGATORS = {"sum": fast_sum, "mean": fast_mean}
+
+def precompute_aggregates(df, instructions):
+    """Runs each step's "aggregate" spec once; returns {query: (spec, Series)}."""
+    cached = {}
+    for step in instructions:
+        spec = step.get("aggregate")
+        if not spec or spec["by"] not in df.columns or spec["value"] not in df.columns:
+            continue
+        result = _AGGREGATORS[spec["agg"]](df, spec["by"], spec["value"])
+        if spec.get("sort_desc"):
+            result = result.sort_values(ascending=False)
+        cached[step["query"]] = (spec, result)
+    return cached
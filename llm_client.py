@@ -0,0 +1,109 @@
+import os
+import uuid
+import asyncio
+import hashlib
+import httpx
+import orjson
+import chromadb
+import openai
+from async_lru import alru_cache
+from openai import AsyncOpenAI
+from tenacity import retry, wait_exponential_jitter, stop_after_attempt, retry_if_exception_type
+
+# --- Shared OpenAI Client ---
+# One client (and one HTTP/2 connection pool) for every agent, so concurrent
+# LLM calls reuse keep-alive sockets instead of paying a TLS handshake each.
+CLIENT = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    http_client=httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+        timeout=120
+    )
+)
+
+# Back off and retry OpenAI calls that hit rate limits. Applied only to the raw API call,
+# so a 429 never re-runs the surrounding batch (or retries nest)
+rate_limit_retry = retry(
+    wait=wait_exponential_jitter(1, 30),
+    stop=stop_after_attempt(5),
+    retry=retry_if_exception_type(openai.RateLimitError),
+    reraise=True
+)
+
+
+# --- Semantic Prompt Cache ---
+@alru_cache(maxsize=1024)
+@rate_limit_retry
+async def _embed_prompt(text):
+    """text-embedding-3-small is deterministic, so repeated texts skip the HTTP call."""
+    emb_response = await CLIENT.embeddings.create(
+        input=text,
+        model="text-embedding-3-small"
+    )
+    return emb_response.data[0].embedding
+
+
+class CachedLLM:
+    """
+    Chat completions behind a local semantic cache.
+
+    Only the variable part of a prompt (`cache_text`: a task, a question, a user request) is
+    embedded and compared. Everything else (model, kwargs and the rest of the messages) must
+    match exactly, via a hash stored with each entry, so prompts sharing a long template
+    never match each other on the template alone.
+    """
+
+    def __init__(self, client=CLIENT, max_distance=0.02):
+        self.client = client
+        self.max_distance = max_distance
+
+        # Shares the RAG agent's local Chroma store, in its own collection
+        self.chroma_client = chromadb.PersistentClient(path="./chroma_db")
+        self.cache = self.chroma_client.get_or_create_collection(
+            name="llm_cache",
+            metadata={"hnsw:space": "cosine"}
+        )
+
+    @staticmethod
+    def _template_hash(model, messages, cache_text, kwargs):
+        """Hash of everything in the request except the variable text."""
+        template = [model, kwargs, [[m["role"], m["content"].replace(cache_text, "")] for m in messages]]
+        return hashlib.blake2b(orjson.dumps(template, option=orjson.OPT_SORT_KEYS), digest_size=16).hexdigest()
+
+    async def complete(self, model, messages, cache_text, **kwargs):
+        """Returns the message content, reusing a cached answer for a near-identical `cache_text`."""
+        template_hash = self._template_hash(model, messages, cache_text, kwargs)
+
+        # 1. Embed the variable text (memoized per exact text)
+        text_embedding = await _embed_prompt(cache_text)
+
+        # 2. Look for a close enough text asked with exactly the same template
+        hits = await asyncio.to_thread(
+            self.cache.query,
+            query_embeddings=[text_embedding],
+            n_results=1,
+            where={"template": template_hash}
+        )
+        if hits['ids'] and hits['ids'][0] and hits['distances'][0][0] < self.max_distance:
+            return hits['metadatas'][0][0]['response']
+
+        # 3. Cache miss: call the model and remember the answer
+        content = await self._create(model, messages, **kwargs)
+        await asyncio.to_thread(
+            self.cache.add,
+            ids=[uuid.uuid4().hex],
+            documents=[cache_text],
+            embeddings=[text_embedding],
+            metadatas=[{"template": template_hash, "model": model, "response": content}]
+        )
+        return content
+
+    @rate_limit_retry
+    async def _create(self, model, messages, **kwargs):
+        response = await self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            **kwargs
+        )
+        return response.choices[0].message.content
@@ -3,6 +3,8 @@ import ReactMarkdown from 'react-markdown';
 // import remarkGfm from 'remark-gfm'; // UNCOMMENT THIS LINE LOCALLY
 import { BarChart, FileText, Database, PenTool, Play, Loader2, Settings, Layers, CheckCircle, Code, Image as ImageIcon, Sparkles } from 'lucide-react';
 
+const API_BASE = 'http://localhost:8000';
+
 const App = () => {
   const [activeTab, setActiveTab] = useState('ingestion');
   const [loading, setLoading] = useState(false);
@@ -17,7 +19,7 @@ const App = () => {
     setError(null);
     setData(null); // Clear previous data
     try {
-      const response = await fetch('http://localhost:8000/generate-report', {
+      const response = await fetch(`${API_BASE}/generate-report/stream`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ 
@@ -25,12 +27,46 @@ const App = () => {
             user_instructions: instructions.trim() 
         }),
       });
-      
-      const result = await response.json();
-      if (result.error) throw new Error(result.error);
-      
-      setData(result);
-      setActiveTab('synthesis'); // Jump to the final report directly for better UX
+      if (!response.ok) throw new Error(`Request failed with status ${response.status}`);
+
+      // The server streams newline-delimited JSON events; render each stage as it arrives
+      const report = { ingestion: null, pandas_agent: [], rag_agent: [], synthesis: { markdown_content: "" } };
+      const applyEvent = (event) => {
+        switch (event.stage) {
+          case 'error':
+            throw new Error(event.error);
+          case 'ingestion':
+            report.ingestion = event.data;
+            break;
+          case 'pandas_agent':
+          case 'rag_agent':
+            report[event.stage] = [...report[event.stage], event.data];
+            break;
+          case 'synthesis_delta':
+            if (!report.synthesis.markdown_content) setActiveTab('synthesis'); // Jump to the report once writing starts
+            report.synthesis = { markdown_content: report.synthesis.markdown_content + event.text };
+            break;
+          case 'synthesis':
+            report.synthesis = event.data;
+            break;
+          default:
+            return;
+        }
+        setData({ ...report });
+      };
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split("\n");
+        buffer = lines.pop();
+        lines.filter(line => line.trim()).forEach(line => applyEvent(JSON.parse(line)));
+      }
+      if (buffer.trim()) applyEvent(JSON.parse(buffer));
     } catch (err) {
       setError(err.message);
     } finally {
@@ -105,10 +141,10 @@ const App = () => {
 
                         {/* Plot Area */}
                         <div className="border rounded-lg p-4 shadow-sm flex flex-col items-center justify-center bg-white min-h-[250px]">
-                            {item.image ? (
+                            {(item.image_url || item.image) ? (
                                 <div className="w-full h-full flex flex-col items-center">
                                     <img 
-                                        src={`data:image/png;base64,${item.image}`} 
+                                        src={item.image_url ? `${API_BASE}${item.image_url}` : `data:image/png;base64,${item.image}`} 
                                         alt={`Plot for ${item.section}`} 
                                         className="max-h-64 object-contain rounded hover:scale-105 transition-transform duration-300"
                                     />
@@ -292,7 +328,7 @@ const App = () => {
                 </div>
             )}
 
-            {loading && (
+            {loading && !data && (
                  <div className="flex flex-col items-center justify-center py-32 space-y-6">
                     <div className="relative">
                         <div className="w-16 h-16 border-4 border-indigo-200 border-t-indigo-600 rounded-full animate-spin"></div>
@@ -307,7 +343,7 @@ const App = () => {
                  </div>
             )}
 
-            {data && !loading && (
+            {data && (
                 <div className="animate-in fade-in slide-in-from-bottom-2 duration-500">
                     {activeTab === 'ingestion' && <IngestionView data={data.ingestion} />}
                     {activeTab === 'pandas' && <PandasAgentView data={data.pandas_agent} />}
@@ -2,20 +2,33 @@ import matplotlib
 matplotlib.use('Agg')  # Must be the very first line
 import uvicorn
 import os
-import json
+import sys
+import orjson
 import base64
 import asyncio
 import shutil
+import re
+import copy
+import hashlib
+import msgspec
+import numpy as np
+from collections import OrderedDict
 import pandas as pd
-from fastapi import FastAPI
+import pyarrow as pa
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from openai import AsyncOpenAI
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from fastapi.staticfiles import StaticFiles
+from llm_client import CLIENT, CachedLLM
 from ImportConfig import DataIngestion, AppConfig
-from DualAgentProcess import PandasAgent, RAGAgent
+from DualAgentProcess import PandasAgent, RAGAgent, data_key
 from InsightSynthesisEngine import InsightSynthesizer
+from fast_aggs import precompute_aggregates
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
+
+# Caps how many plan steps run at once (OpenAI rate limits, exec() threads)
+SEM = asyncio.Semaphore(8)
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,46 +37,199 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Plots are served as static files instead of being inlined in the JSON
+class ImmutableStaticFiles(StaticFiles):
+    """A name always holds the same plot (fresh names for generated code), so clients may cache indefinitely."""
+    async def get_response(self, path, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code == 200:
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+os.makedirs(AppConfig.OUTPUT_DIR, exist_ok=True)
+app.mount("/artifacts", ImmutableStaticFiles(directory=AppConfig.OUTPUT_DIR), name="artifacts")
+
 # --- Startup Cleanup ---
-@app.on_event("startup")
-async def startup_event():
-    """Cleans the artifacts directory on server startup to remove old plots."""
+# Set by __main__ once it has cleaned up, so (re)started workers never delete plots
+# that another worker has just handed out URLs for
+_CLEANED_ENV = "BMW_ARTIFACTS_CLEANED"
+
+async def clean_artifacts():
+    """Cleans the artifacts directory to remove old plots."""
     folder = AppConfig.OUTPUT_DIR
     if os.path.exists(folder):
         print(f"[Server] Cleaning up old artifacts in '{folder}'...")
-        for filename in os.listdir(folder):
-            file_path = os.path.join(folder, filename)
+        with os.scandir(folder) as it:
+            entries = [e.path for e in it if e.is_file() or e.is_symlink()]
+
+        async def remove(file_path):
             try:
-                if os.path.isfile(file_path) or os.path.islink(file_path):
-                    os.unlink(file_path)
+                await asyncio.to_thread(os.unlink, file_path)
+            except FileNotFoundError:
+                pass  # Already removed by another worker
             except Exception as e:
                 print(f"Failed to delete {file_path}. Reason: {e}")
+
+        # Unlinks run concurrently instead of one syscall after another
+        async with asyncio.TaskGroup() as tg:
+            for file_path in entries:
+                tg.create_task(remove(file_path))
     else:
         os.makedirs(folder, exist_ok=True)
     print("[Server] Artifacts folder is ready.")
 
-class ReportRequest(BaseModel):
-    user_instructions: str = None
+@app.on_event("startup")
+async def startup_event():
+    """Cleans up only when launched without __main__ (e.g. `uvicorn server:app`)."""
+    if not os.environ.get(_CLEANED_ENV):
+        await clean_artifacts()
+
+# --- Dataset Cache ---
+def _fast_head_md(df, n=5):
+    """Markdown table of the first n rows, without tabulate's per-cell overhead."""
+    rows = df.head(n)
+    cols = rows.columns.tolist()
+    header = "| " + " | ".join(map(str, cols)) + " |"
+    sep = "|" + "|".join(["---"] * len(cols)) + "|"
+    body = "\n".join("| " + " | ".join(map(str, r)) + " |" for r in rows.itertuples(index=False, name=None))
+    return "\n".join([header, sep, body])
+
+_dataset_lock = asyncio.Lock()
+
+async def load_dataset():
+    """Loads the dataset into app.state, reloading only when the file's mtime changes."""
+    async with _dataset_lock:
+        path = AppConfig.DATA_PATH
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        if mtime is not None and getattr(app.state, "data_mtime", None) == mtime:
+            return
+
+        df = await asyncio.to_thread(DataIngestion(path).load_data)
+        app.state.df = df
+        app.state.columns = df.columns.tolist()
+        app.state.columns_list = ", ".join(app.state.columns)
+        app.state.sample_rows_md = _fast_head_md(df)
+        app.state.preview_dict = pa.Table.from_pandas(df.head(5), preserve_index=False).to_pylist()
+        app.state.cached_aggs = await asyncio.to_thread(
+            precompute_aggregates, df, AppConfig.DEFAULT_INSTRUCTIONS
+        )
+        app.state.data_key = await asyncio.to_thread(data_key, df)
+        app.state.view_cache = {}  # {group key: reduced frame}, filled lazily by PandasAgent
+        app.state.data_mtime = mtime
+
+@app.on_event("startup")
+async def load_dataset_on_startup():
+    """Warms the dataset cache so the first request skips ingestion."""
+    try:
+        await load_dataset()
+        print("[Server] Dataset cached.")
+    except Exception as e:
+        print(f"[Server] Dataset not cached at startup. Reason: {e}")
+
+# --- Request / Response Models ---
+# msgspec Structs: C-level decoding/encoding of the report payload
+class ReportRequest(msgspec.Struct):
+    user_instructions: str | None = None
+    inline_images: bool = False  # Also embed plots as base64 (e.g. for offline clients)
+
+class PandasSection(msgspec.Struct):
+    section: str
+    query: str
+    code: str
+    insight: str
+    image_url: str | None
+    image: str | None
+
+class RagSection(msgspec.Struct):
+    section: str
+    query: str
+    insight: str
+    context: str
+
+class IngestionSection(msgspec.Struct):
+    status: str
+    row_count: int
+    columns: list[str]
+    preview: list[dict]
+
+class SynthesisSection(msgspec.Struct):
+    markdown_content: str
+    saved_path: str
+
+class ReportResponse(msgspec.Struct):
+    pandas_agent: list[PandasSection] = []
+    rag_agent: list[RagSection] = []
+    synthesis: SynthesisSection | None = None
+    ingestion: IngestionSection | None = None
+
+def _enc_hook(obj):
+    """Numpy scalars/arrays (e.g. from the data preview) become plain Python values."""
+    if isinstance(obj, (np.generic, np.ndarray)):
+        return obj.tolist()
+    raise NotImplementedError(f"Cannot encode {type(obj).__name__}")
+
+JSON_ENCODER = msgspec.json.Encoder(enc_hook=_enc_hook)
+_REQUEST_DECODER = msgspec.json.Decoder(ReportRequest)
+
+async def parse_report_request(http_request: Request):
+    """Decodes the POST body straight into a ReportRequest."""
+    try:
+        return _REQUEST_DECODER.decode(await http_request.body())
+    except (msgspec.ValidationError, msgspec.DecodeError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
 # --- Planning Agent (Async) ---
-class PlanningAgent:
-    def __init__(self):
-        self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+_NON_WORD_RE = re.compile(r"[\W_]+")
 
-    async def generate_plan(self, user_input, columns_info, sample_data):
-        prompt = f"""
+def _normalize_request(text):
+    """Lowercase words separated by single spaces, so punctuation and spacing don't matter."""
+    return _NON_WORD_RE.sub(" ", text.lower()).strip()
+
+_TEMPLATE_PHRASES = frozenset(_normalize_request(p) for p in AppConfig.REPORT_TEMPLATE_PHRASES)
+
+# Plans keyed by (user_instructions, schema hash); LRU-bounded and persisted across restarts
+_PLAN_CACHE = OrderedDict()
+_PLAN_CACHE_SIZE = 256
+_PLAN_CACHE_PATH = os.path.join(AppConfig.CACHE_DIR, "plan_cache.json")
+
+def _load_plan_cache():
+    if os.path.exists(_PLAN_CACHE_PATH):
+        with open(_PLAN_CACHE_PATH, "rb") as f:
+            for user_input, schema_hash, plan in orjson.loads(f.read()):
+                _PLAN_CACHE[(user_input, schema_hash)] = plan
+
+def _save_plan_cache():
+    os.makedirs(AppConfig.CACHE_DIR, exist_ok=True)
+    ours = list(_PLAN_CACHE.items())  # Snapshot: this runs in a thread while requests use the cache
+
+    # Keep entries other workers saved since we loaded (as the oldest), ours taking precedence
+    merged = OrderedDict()
+    if os.path.exists(_PLAN_CACHE_PATH):
+        try:
+            with open(_PLAN_CACHE_PATH, "rb") as f:
+                for user_input, schema_hash, plan in orjson.loads(f.read()):
+                    merged[(user_input, schema_hash)] = plan
+        except Exception:
+            pass  # Unreadable file: overwrite it
+    for key, plan in ours:
+        merged.pop(key, None)
+        merged[key] = plan
+    while len(merged) > _PLAN_CACHE_SIZE:
+        merged.popitem(last=False)
+
+    entries = [[user_input, schema_hash, plan] for (user_input, schema_hash), plan in merged.items()]
+    # Write-then-rename, so concurrent uvicorn workers never see a partial file
+    tmp_path = f"{_PLAN_CACHE_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(orjson.dumps(entries))
+    os.replace(tmp_path, _PLAN_CACHE_PATH)
+
+_PLANNER_SYSTEM = """
         You are a Technical Project Manager.
         
-        USER REQUEST: "{user_input}"
-        
-        DATASET SCHEMA:
-        Columns: {columns_info}
-        
-        SAMPLE DATA:
-        {sample_data}
-        
         TASK: 
-        Break the user request into specific execution steps.
+        Break the user request (given in the user message, with the dataset schema and sample data)
+        into specific execution steps.
         
         RULES:
         1. If the step requires calculating numbers/stats from data, set "type" to "high_level".
@@ -78,27 +244,78 @@ class PlanningAgent:
         
         OUTPUT FORMAT (JSON List):
         [
-            {{
+            {
                 "section": "Section Title",
                 "type": "high_level", 
                 "query": "Filter by Year 2023 and sum Sales_Volume..."
-            }},
-            {{
+            },
+            {
                 "section": "Section Title",
                 "type": "detailed",
                 "query": "What key features driven sales in..."
-            }}
+            }
         ]
         """
+
+class PlanningAgent:
+    def __init__(self):
+        self.client = CLIENT
+        self.llm = CachedLLM(self.client)
+        try:
+            _load_plan_cache()
+        except Exception as e:
+            print(f"[Planner] Ignoring unreadable plan cache. Reason: {e}")
+
+    def _template_match(self, user_input):
+        """Returns the canned plan if the request matches a known template, else None."""
+        if _normalize_request(user_input) in _TEMPLATE_PHRASES:
+            return copy.deepcopy(AppConfig.REPORT_INSTRUCTIONS)
+        return None
+
+    async def generate_plan(self, user_input, columns_info, sample_data):
+        template_plan = self._template_match(user_input)
+        if template_plan is not None:
+            print("[Planner] Request matched a built-in template, skipping LLM planning.")
+            return template_plan
+
+        schema_hash = hashlib.blake2b(columns_info.encode(), digest_size=8).hexdigest()
+        cache_key = (user_input, schema_hash)
+        if cache_key in _PLAN_CACHE:
+            _PLAN_CACHE.move_to_end(cache_key)
+            print("[Planner] Reusing cached plan.")
+            return copy.deepcopy(_PLAN_CACHE[cache_key])
+
+        plan = await self._plan_with_llm(user_input, columns_info, sample_data)
+
+        _PLAN_CACHE[cache_key] = copy.deepcopy(plan)
+        if len(_PLAN_CACHE) > _PLAN_CACHE_SIZE:
+            _PLAN_CACHE.popitem(last=False)
+        await asyncio.to_thread(_save_plan_cache)
+        return plan
+
+    async def _plan_with_llm(self, user_input, columns_info, sample_data):
+        # Constant system prompt first, so the shared prefix is cacheable server-side
+        user_prompt = f"""
+        USER REQUEST: "{user_input}"
+        
+        DATASET SCHEMA:
+        Columns: {columns_info}
+        
+        SAMPLE DATA:
+        {sample_data}
+        """
         
-        response = await self.client.chat.completions.create(
+        content = await self.llm.complete(
             model="gpt-4o", # Updated to a valid model name
-            messages=[{"role": "system", "content": prompt}],
+            messages=[
+                {"role": "system", "content": _PLANNER_SYSTEM},
+                {"role": "user", "content": user_prompt}
+            ],
+            cache_text=user_input,
             response_format={"type": "json_object"}
         )
         
-        content = response.choices[0].message.content
-        parsed = json.loads(content)
+        parsed = orjson.loads(content)
         
         if isinstance(parsed, dict):
             for key in ["steps", "instructions", "plan"]:
@@ -108,146 +325,234 @@ class PlanningAgent:
             
         return parsed
 
-def encode_image_to_base64(image_path):
-    if not image_path or not os.path.exists(image_path):
+@app.on_event("startup")
+async def init_shared_agents():
+    """Planner and synthesizer hold no per-request state, so one instance serves every request."""
+    app.state.planner = PlanningAgent()
+    app.state.synthesizer = InsightSynthesizer()
+
+@app.on_event("shutdown")
+async def close_openai_client():
+    """Drains the shared OpenAI connection pool."""
+    await CLIENT.close()
+
+def artifact_url(image_path):
+    if not image_path:
         return None
-    with open(image_path, "rb") as img_file:
-        return base64.b64encode(img_file.read()).decode('utf-8')
+    return f"/artifacts/{os.path.basename(image_path)}"
 
-# --- Main Endpoint ---
-@app.post("/generate-report")
-async def generate_report(request: ReportRequest):
-    
-    response_data = {
-        "pandas_agent": [], 
-        "rag_agent": [],
-        "synthesis": {},
-        "ingestion": {}
-    }
+def _read_and_encode(image_path):
+    try:
+        fd = os.open(image_path, os.O_RDONLY)
+    except FileNotFoundError:
+        return None
+    try:
+        data = os.read(fd, os.fstat(fd).st_size)
+    finally:
+        os.close(fd)
+    return base64.b64encode(data).decode('ascii')  # base64 output is pure ASCII
+
+async def encode_image_to_base64(image_path):
+    """Reads and encodes a plot in a worker thread, keeping the event loop free."""
+    if not image_path:
+        return None
+    return await asyncio.to_thread(_read_and_encode, image_path)
+
+# --- Report Pipeline ---
+async def result_events(batch, inline_images):
+    """Turns one agent's finished results into response events."""
+
+    # Encode all requested inline plots in one concurrent batch
+    image_paths = []
+    if inline_images:
+        image_paths = [res['result']['image'] for res in batch
+                       if res['type'] == 'pandas' and res['result'].get('image')]
+    encoded_images = await asyncio.gather(*[encode_image_to_base64(p) for p in image_paths])
+    plots_base64 = dict(zip(image_paths, encoded_images))
+
+    for res in batch:
+        step = res['step']
+        output = res['result']
+        section_title = step.get('section', 'General Analysis')
+
+        if res['type'] == 'pandas':
+            plot_base64 = plots_base64.get(output.get('image'))
+            
+            yield {"stage": "pandas_agent", "data": PandasSection(
+                section=section_title,
+                query=step['query'],
+                code=output.get('code_executed', 'No code'),
+                insight=output.get('insight', ''),
+                image_url=artifact_url(output.get('image')),
+                image=plot_base64
+            )}
+            
+        elif res['type'] == 'rag':
+            yield {"stage": "rag_agent", "data": RagSection(
+                section=section_title,
+                query=step['query'],
+                insight=output.get('insight', ''),
+                context=output.get('context_used', '')
+            )}
+
+
+async def report_events(request: ReportRequest):
+    """
+    Runs the full report pipeline, yielding each stage's output as soon as it is ready:
+    ingestion -> pandas_agent / rag_agent items -> synthesis_delta chunks -> synthesis.
+    """
 
     # 1. Ingestion
     try:
-        ingestion = DataIngestion(AppConfig.DATA_PATH)
-        df = ingestion.load_data()
+        await load_dataset()
+        df = app.state.df
         
-        columns_list = ", ".join(df.columns.tolist()) 
-        sample_rows = df.head(5).to_markdown(index=False)
+        columns_list = app.state.columns_list
+        sample_rows = app.state.sample_rows_md
         
-        response_data["ingestion"] = {
-            "status": "Success",
-            "row_count": len(df),
-            "columns": list(df.columns),
-            "preview": df.head(5).to_dict(orient="records")
-        }
+        yield {"stage": "ingestion", "data": IngestionSection(
+            status="Success",
+            row_count=len(df),
+            columns=app.state.columns,
+            preview=app.state.preview_dict
+        )}
     except Exception as e:
-        return {"error": str(e)}
+        yield {"stage": "error", "error": str(e)}
+        return
+
+    # Initialize Agents; RAG ingestion (if needed) overlaps planning and the Pandas steps
+    pandas_agent = PandasAgent(df, app.state.cached_aggs, app.state.view_cache, app.state.data_key)
+    rag_agent = RAGAgent(df)
+    rag_ingestion = asyncio.create_task(rag_agent.ensure_ingested())
+    synthesizer = app.state.synthesizer
 
     # 2. Planning
     if request.user_instructions:
         print(f"Generating plan for: {request.user_instructions}")
-        planner = PlanningAgent()
-        instructions = await planner.generate_plan(request.user_instructions, columns_list, sample_rows)
+        instructions = await app.state.planner.generate_plan(request.user_instructions, columns_list, sample_rows)
     else:
         # Default plan updated to meet requirements if no user input is provided
-        instructions = [
-            {
-                "section": "Global Sales Trends",
-                "type": "high_level",
-                "query": "Group data by Year and calculate total Sales_Volume to show the trend over time."
-            },
-            {
-                "section": "Performance by Region",
-                "type": "high_level",
-                "query": "Calculate total Sales_Volume by Region. Sort descending to identify top and bottom performers."
-            },
-            {
-                "section": "Price & Segment Drivers",
-                "type": "high_level",
-                "query": "Analyze average Price_USD by Model to see which segments drive the most value."
-            },
-            {
-                "section": "Regulatory Context",
-                "type": "detailed",
-                "query": "What key market drivers or regulations might impact sales trends for these models?"
-            }
-        ]
-
-    # Initialize Agents
-    pandas_agent = PandasAgent(df)
-    rag_agent = RAGAgent(df)
-    synthesizer = InsightSynthesizer()
+        instructions = copy.deepcopy(AppConfig.DEFAULT_INSTRUCTIONS)
 
     # --- 3. Async Execution Loop ---
     
-    async def process_instruction(step):
-        if step['type'] == 'high_level':
-            result = await pandas_agent.execute_task(step['query'])
-            return {"type": "pandas", "step": step, "result": result}
-            
-        elif step['type'] == 'detailed':
-            result = await rag_agent.execute_task(step['query'])
-            return {"type": "rag", "step": step, "result": result}
-        return None
+    async def process_high_level_steps(steps):
+        """All 'high_level' steps share one code-generation completion."""
+        if not steps:
+            return []
+        async with SEM:
+            outputs = await pandas_agent.execute_batch([step['query'] for step in steps])
+        return [{"type": "pandas", "step": step, "result": output} for step, output in zip(steps, outputs)]
+
+    async def process_detailed_steps(steps):
+        """All 'detailed' steps share one embedding pass, one Chroma query and one completion."""
+        await rag_ingestion
+        if not steps:
+            return []
+        async with SEM:
+            outputs = await rag_agent.execute_batch([step['query'] for step in steps])
+        return [{"type": "rag", "step": step, "result": output} for step, output in zip(steps, outputs)]
 
     print(f"Starting parallel execution of {len(instructions)} steps...")
     
-    tasks = [process_instruction(step) for step in instructions]
-    results = await asyncio.gather(*tasks)
+    high_level_steps = [step for step in instructions if step['type'] == 'high_level']
+    detailed_steps = [step for step in instructions if step['type'] == 'detailed']
+    tasks = [
+        asyncio.create_task(process_high_level_steps(high_level_steps)),
+        asyncio.create_task(process_detailed_steps(detailed_steps))
+    ]
+
+    # --- 4. Collect Results as each agent finishes ---
+    results = []
+    try:
+        for next_batch in asyncio.as_completed(tasks):
+            batch = await next_batch
+            results.extend(batch)
+            # Assemble and emit this agent's results while the other is still running
+            async for event in result_events(batch, request.inline_images):
+                yield event
+    finally:
+        for task in tasks:
+            task.cancel()  # No-op once finished; stops work if a sibling failed or the client left
+
+    await rag_ingestion
+
+    # Restore plan order so sections keep the planner's sequence
+    results.sort(key=lambda res: instructions.index(res['step']))
 
     print(f"[Server Log] Parallel execution finished. Collected {len(results)} results.")
     
-    # --- 4. Collect Results ---
-    
     grouped_sections = {} 
 
     for res in results:
-        if not res: continue
-
-        step = res['step']
-        output = res['result']
-        section_title = step.get('section', 'General Analysis')
+        section_title = res['step'].get('section', 'General Analysis')
 
         # Initialize group
         if section_title not in grouped_sections:
             grouped_sections[section_title] = {'pandas': None, 'rag': None}
+        grouped_sections[section_title][res['type']] = res['result']
 
-        if res['type'] == 'pandas':
-            grouped_sections[section_title]['pandas'] = output
-            
-            plot_base64 = None
-            if output.get('image'):
-                plot_base64 = encode_image_to_base64(output['image'])
-            
-            response_data["pandas_agent"].append({
-                "section": section_title,
-                "query": step['query'],
-                "code": output.get('code_executed', 'No code'),
-                "insight": output.get('insight', ''),
-                "image": plot_base64
-            })
-            
-        elif res['type'] == 'rag':
-            grouped_sections[section_title]['rag'] = output
-            
-            response_data["rag_agent"].append({
-                "section": section_title,
-                "query": step['query'],
-                "insight": output.get('insight', ''),
-                "context": output.get('context_used', '')
-            })
-
+    # 5. Forward the report text as it is generated
     print("Synthesizing full report...")
-    final_markdown = await synthesizer.generate_full_report(grouped_sections)
+    chunks = []
+    async for delta in synthesizer.generate_full_report_stream(grouped_sections):
+        chunks.append(delta)
+        yield {"stage": "synthesis_delta", "text": delta}
+
+    final_markdown = synthesizer.inject_images("".join(chunks), grouped_sections)
     
     saved_path = synthesizer.compile_final_report(final_markdown)
     print(f"Report saved locally at: {saved_path}")
 
-    response_data["synthesis"] = {
-        "markdown_content": final_markdown,
-        "saved_path": saved_path
-    }
+    yield {"stage": "synthesis", "data": SynthesisSection(
+        markdown_content=final_markdown,
+        saved_path=saved_path
+    )}
+
+# --- Main Endpoints ---
+@app.post("/generate-report")
+async def generate_report(http_request: Request):
+    request = await parse_report_request(http_request)
+    response_data = ReportResponse()
+
+    async for event in report_events(request):
+        stage = event["stage"]
+        if stage == "error":
+            return Response(content=JSON_ENCODER.encode({"error": event["error"]}), media_type="application/json")
+        if stage in ("pandas_agent", "rag_agent"):
+            getattr(response_data, stage).append(event["data"])
+        elif stage in ("ingestion", "synthesis"):
+            setattr(response_data, stage, event["data"])
 
-    return response_data
+    return Response(content=JSON_ENCODER.encode(response_data), media_type="application/json")
+
+@app.post("/generate-report/stream")
+async def generate_report_stream(http_request: Request):
+    """Same pipeline as /generate-report, streamed as newline-delimited JSON events."""
+    request = await parse_report_request(http_request)
+
+    async def ndjson():
+        try:
+            async for event in report_events(request):
+                yield JSON_ENCODER.encode(event) + b"\n"
+        except Exception as e:
+            yield JSON_ENCODER.encode({"stage": "error", "error": str(e)}) + b"\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Clean once here rather than in every worker's startup hook
+    asyncio.run(clean_artifacts())
+    os.environ[_CLEANED_ENV] = "1"
+
+    # Chroma's embedded PersistentClient is not process-safe, so one worker by default.
+    # Only raise WEB_CONCURRENCY with Chroma running as a server (chromadb.HttpClient).
+    # Each worker runs its own startup hooks (and so its own dataset cache)
+    uvicorn.run(
+        "server:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+        loop="uvloop" if sys.platform != "win32" else "auto",
+        http="httptools"
+    )
\ No newline at end of file